@@ -1,11 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Date
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import create_engine, event, inspect, text, and_, or_, bindparam, func, delete, insert, select, update, Column, Integer, String, ForeignKey, Date, Index
+from sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.util import await_only
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, deferred, load_only, Session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, date
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+import asyncio
+import base64
+import binascii
+import csv
+import fcntl
+import hashlib
+import logging
+import multiprocessing
+import orjson
+import os
+import threading
+import time
 
 # ===================================================
 # CONFIG
@@ -14,22 +38,304 @@ from datetime import datetime, timedelta, date
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
-DATABASE_URL = "sqlite:///./app.db"
+# sqlite:// or postgresql:// (postgres:// also accepted); see SYNC_DRIVERS
+# and ASYNC_DRIVERS for the driver each mode picks.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Optional read replica for GET requests; empty sends everything to DATABASE_URL.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+# After a write, the client's reads stay on the primary this long so they
+# see the write despite replication lag. Tracked with a cookie, so only
+# clients that send cookies back get this guarantee.
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "0") == "1"
+# Set to 0 when something else (e.g. the gunicorn master) owns schema setup.
+SCHEMA_BOOTSTRAP = os.getenv("SCHEMA_BOOTSTRAP", "1") == "1"
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+# Capped at TOKEN_VERSION_TTL_SECONDS.
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+# Trust uid/department_id claims in the token instead of loading the user.
+STATELESS_TOKENS = os.getenv("STATELESS_TOKENS", "0") == "1"
+# token_version is cached per process for this long. A revocation applies at
+# once in the worker that handled it; other workers (gunicorn) keep
+# accepting the revoked tokens for up to this many seconds, plus any
+# replica lag when DATABASE_REPLICA_URL is set.
+TOKEN_VERSION_TTL_SECONDS = int(os.getenv("TOKEN_VERSION_TTL_SECONDS", "30"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+# Bulk registration hashes this many passwords per pending slot.
+PASSWORD_HASH_BATCH_SIZE = int(os.getenv("PASSWORD_HASH_BATCH_SIZE", "8"))
+BULK_REGISTER_MAX_ROWS = int(os.getenv("BULK_REGISTER_MAX_ROWS", "1000"))
+# A bulk request is held in memory several times over while it is parsed,
+# validated and inserted (~1 KiB per salary row); split larger imports.
+BULK_SALARY_MAX_ROWS = int(os.getenv("BULK_SALARY_MAX_ROWS", "50000"))
+BULK_MAX_BODY_BYTES = int(os.getenv("BULK_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "10"))
+# Requests issuing more SQL statements than this are logged as warnings.
+QUERY_COUNT_WARN_THRESHOLD = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "10"))
+# 0 disables caching of payroll aggregates.
+PAYROLL_CACHE_TTL_SECONDS = int(os.getenv("PAYROLL_CACHE_TTL_SECONDS", "0"))
+# Directory shared by the server's workers (gunicorn.conf.py creates one).
+# Each worker publishes its metrics there and /metrics reports the sum over
+# all of them; empty serves only the answering process's metrics.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+# Other workers' numbers in /metrics can be this many seconds old.
+METRICS_PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "5"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a pooled connection before answering 503.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "2"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+
+# Applied to every new SQLite connection; set SQLITE_TUNING=0 to run with
+# SQLite's defaults, or blank out an individual pragma to leave it alone.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-64000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
+# ===================================================
+# METRICS
+# ===================================================
+
+# Prometheus-style metrics kept as plain ints/floats. Everything observed
+# on the event loop is lock-free; only histograms fed from worker threads
+# take a lock. Label strings are built once per series, never per request.
+
+class Histogram:
+    def __init__(self, buckets: tuple, threadsafe: bool = False):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock() if threadsafe else None
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        if self._lock is None:
+            self.counts[i] += 1
+            self.sum += value
+        else:
+            with self._lock:
+                self.counts[i] += 1
+                self.sum += value
+
+    def snapshot(self):
+        if self._lock is None:
+            return [list(self.buckets), list(self.counts), self.sum]
+        with self._lock:
+            return [list(self.buckets), list(self.counts), self.sum]
+
+
+def render_histogram(name: str, labels: str, buckets: list, counts: list, total: float):
+    sep = "," if labels else ""
+    lines, cumulative = [], 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {total}")
+    lines.append(f"{name}_count{suffix} {cumulative}")
+    return lines
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+password_hash_seconds = Histogram(LATENCY_BUCKETS)
+password_verify_seconds = Histogram(LATENCY_BUCKETS)
+pool_checkout_seconds = Histogram(
+    (0.0001, 0.001, 0.01, 0.1, 1.0, 5.0, 10.0, 30.0), threadsafe=True
+)
+
+
+class _TimedCheckout:
+    # Pool implementations fetch connections in _do_get; time the wait.
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
 
 # ===================================================
 # DATABASE SETUP
 # ===================================================
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def tune_sqlite(engine, pragmas: dict = SQLITE_PRAGMAS):
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value:
+                cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+# Heroku-style URLs still use the dialect's old name.
+DIALECT_ALIASES = {"postgres": "postgresql"}
+
+# Used when the URL doesn't name a driver itself.
+SYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+}
+
+# The sync engine (migrations, manage.py, gunicorn's on_starting) can't use
+# an async driver named in the URL; swap in its sync counterpart.
+SYNC_EQUIVALENTS = {
+    "asyncpg": "psycopg",
+    "psycopg_async": "psycopg",
+    "aiosqlite": "pysqlite",
+}
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def _split_url(url: str):
+    scheme, rest = url.split("://", 1)
+    dialect, _, driver = scheme.partition("+")
+    return DIALECT_ALIASES.get(dialect, dialect), driver, rest
+
+def sync_url(url: str):
+    dialect, driver, rest = _split_url(url)
+    driver = SYNC_EQUIVALENTS.get(driver, driver)
+    scheme = f"{dialect}+{driver}" if driver else SYNC_DRIVERS.get(dialect, dialect)
+    return f"{scheme}://{rest}"
+
+def async_url(url: str):
+    dialect, driver, rest = _split_url(url)
+    scheme = ASYNC_DRIVERS.get(dialect, f"{dialect}+{driver}" if driver else dialect)
+    return f"{scheme}://{rest}"
+
+def engine_options(url: str):
+    options = dict(POOL_OPTIONS)
+    if _split_url(url)[0] == "sqlite":
+        # Sessions are handed between threadpool workers.
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+def make_engine(url: str):
+    engine = create_engine(sync_url(url), poolclass=TimedQueuePool, **engine_options(url))
+    if SQLITE_TUNING and engine.dialect.name == "sqlite":
+        tune_sqlite(engine)
+    return engine
+
+engine = make_engine(DATABASE_URL)
+replica_engine = make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
 SessionLocal = sessionmaker(bind=engine)
+ReplicaSessionLocal = sessionmaker(bind=replica_engine, info={"replica": True})
 Base = declarative_base()
 
-def get_db():
+# GET and HEAD requests read from the replica. Any other request that opens
+# a session sets a cookie pinning the client to the primary for
+# READ_YOUR_WRITES_SECONDS. The cookie holds the deadline, so every worker
+# agrees on it without shared state. Read-your-writes therefore needs a
+# client that sends cookies back; one that doesn't still authenticates
+# (get_current_user retries replica misses on the primary) but may read
+# data up to the replication lag old.
+READ_METHODS = {"GET", "HEAD"}
+PRIMARY_COOKIE = "apis_primary_until"
+
+def reads_from_replica(request: Request):
+    if replica_engine is engine or request.method not in READ_METHODS:
+        return False
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, "0")) <= time.time()
+    except ValueError:
+        return True
+
+def pin_to_primary(request: Request, response: Response):
+    if replica_engine is not engine and request.method not in READ_METHODS:
+        response.set_cookie(
+            PRIMARY_COOKIE, str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax"
+        )
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    def make_async_engine(url: str):
+        engine = create_async_engine(
+            async_url(url), poolclass=TimedAsyncQueuePool, **POOL_OPTIONS
+        )
+        if SQLITE_TUNING and engine.dialect.name == "sqlite":
+            tune_sqlite(engine.sync_engine)
+        return engine
+
+    async_engine = make_async_engine(DATABASE_URL)
+    async_replica_engine = (
+        make_async_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else async_engine
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        bind=async_replica_engine, expire_on_commit=False, info={"replica": True}
+    )
+
+    async def get_db(request: Request, response: Response):
+        pin_to_primary(request, response)
+        sessions = AsyncReplicaSessionLocal if reads_from_replica(request) else AsyncSessionLocal
+        async with sessions() as db:
+            yield db
+
+    async def run_db(db, fn, *args):
+        # Runs the sync ORM code on the event loop via greenlets.
+        return await db.run_sync(fn, *args)
+else:
+    async def get_db(request: Request, response: Response):
+        # A Session only checks out a connection on its first query, so
+        # requests answered from caches never touch the pool. Closing one
+        # that did may roll back on the connection, so that goes to a thread.
+        pin_to_primary(request, response)
+        db = (ReplicaSessionLocal if reads_from_replica(request) else SessionLocal)()
+        try:
+            yield db
+        finally:
+            if db.in_transaction():
+                await run_in_threadpool(db.close)
+            else:
+                db.close()
+
+    async def run_db(db, fn, *args):
+        return await run_in_threadpool(fn, db, *args)
+
+async def run_on_primary(fn, *args):
+    """Run fn(db, *args) in a short-lived session on the primary."""
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            return await run_db(db, fn, *args)
     db = SessionLocal()
     try:
-        yield db
+        return await run_db(db, fn, *args)
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
 
 # ===================================================
 # MODELS
@@ -50,8 +356,14 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-    department_id = Column(Integer, ForeignKey("departments.id"))
+    # Only login needs it; everywhere else it would be dead weight per row.
+    hashed_password = deferred(Column(String))
+    department_id = Column(Integer, ForeignKey("departments.id"), index=True)
+    # Bumped to revoke every token issued to the user so far.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Projection of the latest salaries row, maintained on every salary write.
+    current_salary = Column(Integer)
+    current_salary_date = Column(Date)
 
     department = relationship("Department", back_populates="users")
     salaries = relationship("Salary", back_populates="user")
@@ -67,7 +379,82 @@ class Salary(Base):
 
     user = relationship("User", back_populates="salaries")
 
-Base.metadata.create_all(bind=engine)
+    # Leading user_id column also serves plain `WHERE user_id = ?` lookups.
+    __table_args__ = (
+        Index("ix_salaries_user_id_effective_date", "user_id", "effective_date"),
+    )
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+
+
+# Bump whenever migrate_schema has something new to apply.
+SCHEMA_VERSION = 3
+
+def migrate_schema(engine):
+    # create_all only builds missing tables; columns and indexes added to
+    # existing tables since they were created are applied here.
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        added = set()
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    added.add((table.name, column.name))
+        if ("users", "current_salary") in added:
+            backfill_current_salary(conn)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        conn.execute(delete(SchemaVersion))
+        conn.execute(insert(SchemaVersion).values(version=SCHEMA_VERSION))
+
+def backfill_current_salary(conn):
+    """Rebuild users.current_salary from the salaries history."""
+    salaries, users = Salary.__table__, User.__table__
+    latest = select(salaries.c.amount).where(
+        salaries.c.user_id == users.c.id
+    ).order_by(
+        salaries.c.effective_date.desc(), salaries.c.id.desc()
+    ).limit(1)
+
+    return conn.execute(update(users).values(
+        current_salary=latest.scalar_subquery(),
+        current_salary_date=latest.with_only_columns(
+            salaries.c.effective_date
+        ).scalar_subquery()
+    )).rowcount
+
+schema_logger = logging.getLogger("apis.schema")
+
+def ensure_schema(engine):
+    """Migrate if the database records a version older than SCHEMA_VERSION.
+
+    A newer version (e.g. an old build during a rolling deploy) is left
+    alone. Returns True if a migration ran.
+    """
+    with engine.connect() as conn:
+        if inspect(conn).has_table(SchemaVersion.__tablename__):
+            version = conn.scalar(select(SchemaVersion.version))
+            if version is not None and version > SCHEMA_VERSION:
+                schema_logger.warning(
+                    "Database schema version %s is newer than this build's %s; "
+                    "not migrating", version, SCHEMA_VERSION
+                )
+                return False
+            if version == SCHEMA_VERSION:
+                return False
+    migrate_schema(engine)
+    return True
 
 # ===================================================
 # AUTH SETUP
@@ -82,14 +469,302 @@ def hash_password(password: str):
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+def hash_passwords(passwords: list):
+    return [hash_password(p) for p in passwords]
+
+def _timed_call(fn, *args):
+    # Runs in the worker process; the parent records the duration.
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so hashing never holds a request thread.
+
+    At most `max_pending` operations may be queued or running; beyond that
+    callers get an immediate 503 with Retry-After instead of waiting.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Password hashing service is busy",
+                    headers={"Retry-After": str(self.retry_after)}
+                )
+            self._pending += 1
+            if self._executor is None:
+                # Only when used outside the app; lifespan normally starts it.
+                self._executor = self._new_executor()
+            return self._executor
+
+    def _new_executor(self):
+        # Never fork: the server already runs threadpool threads, and a
+        # child forked mid-lock can deadlock. forkserver/spawn children
+        # import apis.main afresh, which doesn't touch the database.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def _submit(self, fn, *args):
+        executor = self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, _timed_call, fn, *args)
+        finally:
+            self._release()
+
+    async def _run(self, histogram, fn, *args):
+        result, elapsed = await self._submit(fn, *args)
+        histogram.observe(elapsed)
+        return result
+
+    async def hash(self, password: str):
+        return await self._run(password_hash_seconds, hash_password, password)
+
+    async def verify(self, plain, hashed):
+        return await self._run(password_verify_seconds, verify_password, plain, hashed)
+
+    async def hash_many(self, passwords: list, batch_size: int = PASSWORD_HASH_BATCH_SIZE):
+        # Small batches, each taking its own pending slot, with at most one
+        # batch per worker in flight. Other callers wait behind one batch
+        # at most, and a full queue fails the request fast as for anyone.
+        hashes = [None] * len(passwords)
+        starts = iter(range(0, len(passwords), batch_size))
+
+        async def worker():
+            for start in starts:
+                batch = passwords[start:start + batch_size]
+                hashed, elapsed = await self._submit(hash_passwords, batch)
+                for _ in batch:
+                    password_hash_seconds.observe(elapsed / len(batch))
+                hashes[start:start + batch_size] = hashed
+
+        tasks = [
+            asyncio.ensure_future(worker())
+            for _ in range(min(self.workers, -(-len(passwords) // batch_size)))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return hashes
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_RETRY_AFTER_SECONDS
+)
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme),
-                     db: Session = Depends(get_db)):
+# ===================================================
+# PRINCIPAL CACHE
+# ===================================================
+
+class PrincipalCache:
+    """Bounded LRU of token -> User so repeat tokens skip the users lookup.
+
+    Entries live for at most `ttl` seconds and never past the token's own
+    `exp`. Cached users are detached and only carry the columns loaded by
+    _find_user (id, username, department_id, token_version).
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (expires_at, user)
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, user, token_exp: float | None = None):
+        if self.maxsize <= 0:
+            return
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + lifetime, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [t for t, (_, u) in self._entries.items() if u.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(
+    PRINCIPAL_CACHE_SIZE, min(PRINCIPAL_CACHE_TTL_SECONDS, TOKEN_VERSION_TTL_SECONDS)
+)
+
+
+class TokenVersionCache:
+    """user id -> token_version, refreshed from the DB every `ttl` seconds.
+
+    Revocations made by this process apply immediately; ones made by other
+    workers apply within `ttl`.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._versions = {}  # user id -> (expires_at, version)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self._versions.pop(user_id, None)
+                return None
+            return entry[1]
+
+    def put(self, user_id: int, version: int):
+        with self._lock:
+            self._versions[user_id] = (time.monotonic() + self.ttl, version)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+
+token_versions = TokenVersionCache(TOKEN_VERSION_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+    token_versions.invalidate(target.id)
+
+
+class Principal(BaseModel):
+    """Authenticated user rebuilt from token claims, without a DB row."""
+    id: int
+    username: str
+    department_id: int | None=None
+
+
+def _find_user(db: Session, username: str):
+    # Just what authentication and the cached principal need.
+    user = db.query(User).options(
+        load_only(User.id, User.username, User.department_id, User.token_version)
+    ).filter(User.username == username).first()
+    if user is not None:
+        # Detach so a later commit in this session can't expire the cached copy.
+        db.expunge(user)
+    return user
+
+
+def _token_version(db: Session, user_id: int):
+    return db.scalar(select(User.token_version).where(User.id == user_id))
+
+
+async def _check_token_version(db: Session, user_id: int, claimed: int):
+    # Another worker's revocation shows up here once the cached version
+    # expires, i.e. within TOKEN_VERSION_TTL_SECONDS.
+    version = token_versions.get(user_id)
+    if version is None:
+        version = await run_db(db, _token_version, user_id)
+        if db.info.get("replica") and version != claimed:
+            # A lagging replica may not have the user or their new version.
+            version = await run_on_primary(_token_version, user_id)
+        if version is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        token_versions.put(user_id, version)
+
+    if claimed != version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+
+async def _stateless_principal(payload: dict, db: Session):
+    user_id = payload.get("uid")
+    await _check_token_version(db, user_id, payload.get("token_version", 0))
+
+    return Principal(
+        id=user_id,
+        username=payload["sub"],
+        department_id=payload.get("department_id")
+    )
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: Session = Depends(get_db)):
+
+    if not STATELESS_TOKENS:
+        cached = principal_cache.get(token)
+        if cached is not None:
+            try:
+                await _check_token_version(db, cached.id, cached.token_version)
+            except HTTPException:
+                principal_cache.invalidate_user(cached.id)
+                raise
+            return cached
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -99,10 +774,21 @@ def get_current_user(token: str = Depends(oauth2_scheme),
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.username == username).first()
+    if STATELESS_TOKENS and "uid" in payload:
+        return await _stateless_principal(payload, db)
+
+    user = await run_db(db, _find_user, username)
+    if db.info.get("replica") and (
+            user is None or payload.get("token_version", 0) != user.token_version):
+        # A lagging replica may not have the user or their new version.
+        user = await run_on_primary(_find_user, username)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    if payload.get("token_version", 0) != user.token_version:
+        raise HTTPException(status_code=401, detail="Token revoked")
 
+    token_versions.put(user.id, user.token_version)
+    principal_cache.put(token, user, payload.get("exp"))
     return user
 
 # ===================================================
@@ -129,6 +815,7 @@ class UserResponse(BaseModel):
     id: int
     username: str
     department_id: int | None=None
+    current_salary: int | None=None
     class Config:
         orm_mode = True
 
@@ -136,75 +823,816 @@ class SalaryCreate(BaseModel):
     user_id: int
     amount: int
 
+class SalaryBulkRow(SalaryCreate):
+    effective_date: date | None=None
+
+class PayrollResponse(BaseModel):
+    department_id: int
+    department: str | None=None
+    headcount: int
+    total: int | None=None
+    average: float | None=None
+    min: int | None=None
+    max: int | None=None
+
+# ===================================================
+# PAGINATION
+# ===================================================
+
+# List endpoints page on primary key: `?limit=N&after=<cursor>`. The cursor
+# for the next page is returned in the X-Next-Cursor header and is absent on
+# the last page.
+
+def encode_cursor(last_id: int):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str | None):
+    if cursor is None:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _page(db: Session, model, columns: list, after_id: int, limit: int):
+    # Fetch one extra row to learn whether another page exists.
+    rows = db.execute(
+        select(*columns).where(
+            model.id > after_id
+        ).order_by(model.id).limit(limit + 1)
+    ).all()
+
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1].id)
+    return rows, None
+
+def _render_page(db: Session, model, schema, after_id: int, limit: int):
+    # Select exactly the response fields as plain rows and encode them
+    # straight away: no ORM instances, no per-row model validation.
+    columns = [getattr(model, name) for name in schema.model_fields]
+    rows, next_cursor = _page(db, model, columns, after_id, limit)
+    body = orjson.dumps([row._asdict() for row in rows])
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else {}
+    return body, headers
+
+# ===================================================
+# RESPONSE CACHE
+# ===================================================
+
+# Rendered list pages are kept per process, tagged with the versions of
+# the tables they were built from. Every write bumps its tables' versions
+# through data_changed(), which makes the affected pages stale. Versions are
+# per process, so entries also expire after RESPONSE_CACHE_TTL_SECONDS. That
+# bounds how long a write made by another worker can go unseen. ETags are a
+# digest of the body, so every worker agrees on them.
+
+class TableVersions:
+    def __init__(self):
+        self._versions = {}
+        self._changed_at = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        now = time.monotonic()
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._changed_at[table] = now
+
+    def changed_within(self, tables: tuple, seconds: float):
+        cutoff = time.monotonic() - seconds
+        with self._lock:
+            return any(self._changed_at.get(t, float("-inf")) > cutoff for t in tables)
+
+    def snapshot(self, tables: tuple):
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+
+class CachedResponse(NamedTuple):
+    expires_at: float
+    versions: tuple
+    etag: str
+    body: bytes
+    headers: dict
+
+
+class ResponseCache:
+    """LRU of rendered responses, bounded by total body size."""
+
+    def __init__(self, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.versions != versions
+                                      or entry.expires_at <= time.monotonic()):
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, versions: tuple, body: bytes, headers: dict, store: bool = True):
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = CachedResponse(time.monotonic() + self.ttl, versions, etag, body, headers)
+        if not store or len(body) > self.max_bytes or self.ttl <= 0:
+            return entry
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+        return entry
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+table_versions = TableVersions()
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+
+
+def data_changed(*tables: str):
+    """Call after committing writes to `tables`."""
+    table_versions.bump(*tables)
+    payroll_cache.invalidate()
+
+
+def _etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def cached_response(request: Request, key, tables: tuple, render):
+    # Pages rendered from a lagging replica must not be served to a client
+    # that is pinned to the primary after a write, nor be cached under the
+    # version of a write the replica may not have applied yet.
+    replica = reads_from_replica(request)
+    key = (key, replica)
+    versions = table_versions.snapshot(tables)
+    entry = response_cache.get(key, versions)
+    if entry is None:
+        body, headers = await render()
+        store = not (replica and table_versions.changed_within(tables, READ_YOUR_WRITES_SECONDS))
+        entry = response_cache.put(key, versions, body, headers, store)
+
+    headers = {"ETag": entry.etag, **entry.headers}
+    if _etag_matches(request, entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+# ===================================================
+# BULK INPUT
+# ===================================================
+
+# Bulk endpoints take the raw request body as a JSON array, NDJSON
+# (application/x-ndjson) or CSV with a header row (text/csv). Rows are
+# validated individually and reported back by their 0-based position.
+
+async def read_bulk_body(request: Request):
+    """The request body, or 413 once it exceeds BULK_MAX_BODY_BYTES."""
+    too_large = HTTPException(
+        status_code=413, detail=f"Body larger than {BULK_MAX_BODY_BYTES} bytes"
+    )
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > BULK_MAX_BODY_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > BULK_MAX_BODY_BYTES:
+            raise too_large
+    return bytes(body)
+
+def parse_bulk_body(body: bytes, content_type: str, max_rows: int):
+    rows = _parse_bulk_rows(body, content_type)
+    if len(rows) > max_rows:
+        raise HTTPException(status_code=413, detail=f"At most {max_rows} rows per request")
+    return rows
+
+def _parse_bulk_rows(body: bytes, content_type: str):
+    try:
+        text = body.decode("utf-8-sig")
+        if content_type.startswith("text/csv"):
+            return [
+                {k: v for k, v in row.items() if v not in ("", None)}
+                for row in csv.DictReader(text.splitlines())
+            ]
+        if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+            return [orjson.loads(line) for line in text.splitlines() if line.strip()]
+        rows = orjson.loads(text)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    return rows
+
+def validate_rows(rows: list, model):
+    valid, errors = [], []
+    for i, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise TypeError("Expected an object")
+            valid.append((i, model(**row)))
+        except (ValidationError, TypeError) as e:
+            detail = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                for err in e.errors()
+            ) if isinstance(e, ValidationError) else str(e)
+            errors.append({"row": i, "detail": detail})
+    return valid, errors
+
+def chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def existing_ids(db: Session, column, ids):
+    found = set()
+    for chunk in chunks(sorted(ids), BULK_CHUNK_SIZE):
+        found.update(db.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+# Drivers copy_rows knows how to COPY through; other PostgreSQL drivers
+# (psycopg2, pg8000, ...) fall back to executemany.
+COPY_DRIVERS = {"psycopg", "asyncpg"}
+
+def bulk_insert(db: Session, table, rows: list):
+    """Insert dict rows: COPY on PostgreSQL, chunked executemany elsewhere."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver in COPY_DRIVERS:
+        copy_rows(db.connection(), table, rows)
+    else:
+        for chunk in chunks(rows, BULK_CHUNK_SIZE):
+            db.execute(insert(table), chunk)
+
+def copy_rows(conn, table, rows: list):
+    # COPY bypasses SQLAlchemy's cursor, so driver errors are translated
+    # here to keep IntegrityError handling the same on every backend.
+    columns = list(rows[0])
+    records = [tuple(row[c] for c in columns) for row in rows]
+    raw = conn.connection.driver_connection
+    dbapi = conn.dialect.dbapi
+    if conn.dialect.driver == "asyncpg":
+        integrity_error = dbapi.asyncpg.IntegrityConstraintViolationError
+    else:
+        integrity_error = dbapi.IntegrityError
+
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    try:
+        if conn.dialect.driver == "asyncpg":
+            # SQLAlchemy's asyncpg adapter only sends BEGIN with the first
+            # statement; issue one so the COPY joins the session's
+            # transaction instead of autocommitting.
+            if not raw.is_in_transaction():
+                conn.exec_driver_sql("SELECT 1")
+            # Runs inside run_sync, so the coroutine can be awaited from
+            # this greenlet.
+            await_only(raw.copy_records_to_table(
+                table.name, records=records, columns=columns
+            ))
+        else:
+            with raw.cursor() as cursor, cursor.copy(statement) as copy:
+                for record in records:
+                    copy.write_row(record)
+    except integrity_error as exc:
+        raise IntegrityError(statement, None, exc) from exc
+
 # ===================================================
 # APP
 # ===================================================
 
-app = FastAPI()
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, which handles date natively."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEMA_BOOTSTRAP:
+        await run_in_threadpool(ensure_schema, engine)
+    password_hasher.start()
+    if METRICS_DIR:
+        publisher = asyncio.create_task(publish_metrics_periodically())
+    yield
+    if METRICS_DIR:
+        publisher.cancel()
+        publish_metrics()
+    password_hasher.shutdown()
+    if DATABASE_ASYNC:
+        await async_engine.dispose()
+        await async_replica_engine.dispose()
+
+
+# FastJSONResponse is set per route, only on routes returning plain dicts:
+# as an app-wide default it would also replace FastAPI's faster Pydantic
+# serialization on the response_model routes.
+app = FastAPI(lifespan=lifespan)
+
+# ===================================================
+# INSTRUMENTATION
+# ===================================================
+
+# Every request gets a RequestStats in a context variable; the engine's
+# cursor hooks add to whichever one is current. Thread-pool and run_sync
+# calls inherit the request's context, so their queries count too.
+
+request_logger = logging.getLogger("apis.requests")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine):
+    # The start time lives on the per-statement execution context, so a
+    # failed statement (no after_cursor_execute) leaves nothing behind.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+
+class RouteMetrics:
+    __slots__ = ("labels", "latency", "statuses")
+
+    def __init__(self, method: str, route: str):
+        self.labels = f'method="{method}",route="{route}"'
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statuses = {}  # status code -> count
+
+
+route_metrics = {}  # (method, route path) -> RouteMetrics
+requests_in_flight = 0
+
+
+def _record_request(scope, status: int, elapsed: float):
+    route = scope.get("route")
+    # Unmatched paths share one series so scanners can't blow up cardinality.
+    key = (scope["method"], route.path if route is not None else "<unmatched>")
+    metrics = route_metrics.get(key)
+    if metrics is None:
+        metrics = route_metrics[key] = RouteMetrics(*key)
+    metrics.latency.observe(elapsed)
+    metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+
+class InstrumentationMiddleware:
+    """Records route metrics, adds a Server-Timing header with SQL count/time
+    and logs each request."""
+
+    def __init__(self, app, threshold: int = QUERY_COUNT_WARN_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        global requests_in_flight
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+        requests_in_flight += 1
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;desc="{stats.queries} queries";dur={stats.db_seconds * 1000:.2f}, '
+                    f"total;dur={total_ms:.2f}"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_flight -= 1
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            _record_request(scope, status, elapsed)
+            self._log(scope, status, stats, elapsed)
+
+    def _log(self, scope, status, stats, elapsed):
+        level = logging.WARNING if stats.queries > self.threshold else logging.DEBUG
+        if not request_logger.isEnabledFor(level):
+            return
+        request_logger.log(level, orjson.dumps({
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "queries": stats.queries,
+            "db_ms": round(stats.db_seconds * 1000, 3),
+            "duration_ms": round(elapsed * 1000, 3),
+        }).decode())
+
+
+instrument_engine(engine)
+if replica_engine is not engine:
+    instrument_engine(replica_engine)
+if DATABASE_ASYNC:
+    instrument_engine(async_engine.sync_engine)
+    if async_replica_engine is not async_engine:
+        instrument_engine(async_replica_engine.sync_engine)
+app.add_middleware(InstrumentationMiddleware)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_exhausted(request: Request, exc: PoolTimeoutError):
+    return FastJSONResponse(
+        {"detail": "Database is busy"},
+        status_code=503,
+        headers={"Retry-After": "1"}
+    )
+
+
+def collect_metrics():
+    """This process's series as {(kind, family, labels): value}; a
+    histogram's value is [buckets, counts, sum]."""
+    series = {}
+    for m in list(route_metrics.values()):
+        for status, count in list(m.statuses.items()):
+            series["counter", "apis_http_requests_total", f'{m.labels},status="{status}"'] = count
+    for m in list(route_metrics.values()):
+        series["histogram", "apis_http_request_duration_seconds", m.labels] = m.latency.snapshot()
+    series["gauge", "apis_http_requests_in_flight", ""] = requests_in_flight
+    for family, histogram in (("apis_password_hash_duration_seconds", password_hash_seconds),
+                              ("apis_password_verify_duration_seconds", password_verify_seconds),
+                              ("apis_db_pool_checkout_duration_seconds", pool_checkout_seconds)):
+        series["histogram", family, ""] = histogram.snapshot()
+
+    if DATABASE_ASYNC:
+        pools = {
+            "primary": async_engine.sync_engine.pool,
+            "replica": async_replica_engine.sync_engine.pool,
+        }
+    else:
+        pools = {"primary": engine.pool, "replica": replica_engine.pool}
+    if pools["replica"] is pools["primary"]:
+        del pools["replica"]
+    for family, gauge in (("apis_db_pool_size", lambda p: p.size()),
+                          ("apis_db_pool_checked_out", lambda p: p.checkedout()),
+                          ("apis_db_pool_overflow", lambda p: max(p.overflow(), 0))):
+        for name, pool in pools.items():
+            series["gauge", family, f'database="{name}"'] = gauge(pool)
+
+    caches = {"principal": principal_cache.stats(), "response": response_cache.stats()}
+    for family, key in (("apis_cache_hits_total", "hits"),
+                        ("apis_cache_misses_total", "misses")):
+        for name, stats in caches.items():
+            series["counter", family, f'cache="{name}"'] = stats[key]
+    return series
+
+
+def render_metrics(series: dict):
+    series = dict(series)
+    # Computed from the (possibly summed) counters, not averaged per worker.
+    for (kind, family, labels), hits in list(series.items()):
+        if family == "apis_cache_hits_total":
+            lookups = hits + series.get(("counter", "apis_cache_misses_total", labels), 0)
+            series["gauge", "apis_cache_hit_ratio", labels] = hits / lookups if lookups else 0.0
+
+    families = {}  # family -> (kind, [(labels, value)])
+    for (kind, family, labels), value in series.items():
+        families.setdefault(family, (kind, []))[1].append((labels, value))
+
+    lines = []
+    for family, (kind, rows) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        for labels, value in rows:
+            if kind == "histogram":
+                lines += render_histogram(family, labels, *value)
+            else:
+                lines.append(f"{family}{{{labels}}} {value}" if labels else f"{family} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# With METRICS_DIR set, every worker writes its series to <pid>.json there:
+# periodically, on shutdown and when it answers /metrics. Gauges get a
+# worker label; counters and histograms are summed over the files. When a
+# worker exits, gunicorn.conf.py renames its file to exited-*.json, whose
+# counters keep counting towards the totals so they never go backwards.
+
+def publish_metrics():
+    rows = [
+        [kind, family, f'worker="{os.getpid()}"' + (f",{labels}" if labels else "")
+         if kind == "gauge" else labels, value]
+        for (kind, family, labels), value in collect_metrics().items()
+    ]
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    with open(path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(rows))
+    os.replace(path + ".tmp", path)
+
+
+async def publish_metrics_periodically():
+    while True:
+        await asyncio.sleep(METRICS_PUBLISH_SECONDS)
+        publish_metrics()
+
+
+def _merge_series(series: dict, rows: list):
+    for kind, family, labels, value in rows:
+        key = (kind, family, labels)
+        current = series.get(key)
+        if current is None:
+            series[key] = value
+        elif kind == "histogram":
+            series[key] = [
+                current[0], [a + b for a, b in zip(current[1], value[1])], current[2] + value[2]
+            ]
+        else:
+            series[key] = current + value
+
+
+def merge_published_metrics():
+    """Totals over the files in METRICS_DIR.
+
+    Also folds the files of exited workers into one, so they don't pile up
+    as workers are replaced.
+    """
+    series, exited = {}, {}
+    # Held exclusively: gunicorn.conf.py takes the same lock to retire a
+    # worker's file, so no file is counted twice or skipped.
+    with open(os.path.join(METRICS_DIR, "lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        names = sorted(name for name in os.listdir(METRICS_DIR) if name.endswith(".json"))
+        exited_names = [name for name in names if name.startswith("exited")]
+        for name in names:
+            with open(os.path.join(METRICS_DIR, name), "rb") as f:
+                rows = orjson.loads(f.read())
+            if name in exited_names:
+                # A gone worker's gauges no longer describe anything.
+                _merge_series(exited, [row for row in rows if row[0] != "gauge"])
+            else:
+                _merge_series(series, rows)
+
+        if len(exited_names) > 1:
+            path = os.path.join(METRICS_DIR, "exited.json")
+            with open(path + ".tmp", "wb") as f:
+                f.write(orjson.dumps([[*key, value] for key, value in exited.items()]))
+            os.replace(path + ".tmp", path)
+            for name in exited_names:
+                if name != "exited.json":
+                    os.remove(os.path.join(METRICS_DIR, name))
+
+    _merge_series(series, [[*key, value] for key, value in exited.items()])
+    return series
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if METRICS_DIR:
+        publish_metrics()
+        series = await run_in_threadpool(merge_published_metrics)
+    else:
+        series = collect_metrics()
+    return PlainTextResponse(
+        render_metrics(series), media_type="text/plain; version=0.0.4"
+    )
 
 # ===================================================
 # REGISTER
 # ===================================================
 
-@app.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if user.department_id:
-        dept = db.query(Department).filter(
-            Department.id == user.department_id
-        ).first()
+def _check_new_user(db: Session, user: UserCreate):
+    try:
+        if user.department_id:
+            dept = db.query(Department.id).filter(
+                Department.id == user.department_id
+            ).first()
 
-        if not dept:
-            raise HTTPException(status_code=400, detail="Department not found")
+            if not dept:
+                raise HTTPException(status_code=400, detail="Department not found")
 
-    existing_user = db.query(User).filter(
-        User.username == user.username
-    ).first()
+        existing_user = db.query(User.id).filter(
+            User.username == user.username
+        ).first()
+
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Username already exists")
+    finally:
+        # Hand the connection back before the caller waits on bcrypt.
+        db.rollback()
 
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
 
+def _insert_user(db: Session, user: UserCreate, hashed_password: str):
     new_user = User(
         username=user.username,
-        hashed_password=hash_password(user.password),
+        hashed_password=hashed_password,
         department_id=user.department_id
     )
 
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    data_changed("users")
+
+
+@app.post("/register", response_class=FastJSONResponse)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    await run_db(db, _check_new_user, user)
+    hashed_password = await password_hasher.hash(user.password)
+    await run_db(db, _insert_user, user, hashed_password)
 
     return {"message": "User registered successfully"}
 
+def _plan_bulk_register(db: Session, body: bytes, content_type: str):
+    rows = parse_bulk_body(body, content_type, BULK_REGISTER_MAX_ROWS)
+    valid, errors = validate_rows(rows, UserCreate)
+
+    try:
+        taken = existing_ids(db, User.username, {row.username for _, row in valid})
+        departments = existing_ids(
+            db, Department.id, {row.department_id for _, row in valid if row.department_id}
+        )
+    finally:
+        # Hand the connection back before the caller waits on bcrypt.
+        db.rollback()
+
+    accepted, seen = [], set()
+    for i, row in valid:
+        if row.department_id and row.department_id not in departments:
+            errors.append({"row": i, "detail": "Department not found"})
+        elif row.username in taken or row.username in seen:
+            errors.append({"row": i, "detail": "Username already exists"})
+        else:
+            seen.add(row.username)
+            accepted.append((i, row))
+    return accepted, errors
+
+
+def _insert_users(db: Session, rows: list, hashed_passwords: list):
+    values = [
+        {
+            "username": row.username,
+            "hashed_password": hashed,
+            "department_id": row.department_id
+        }
+        for (_, row), hashed in zip(rows, hashed_passwords)
+    ]
+    try:
+        bulk_insert(db, User.__table__, values)
+        db.commit()
+        data_changed("users")
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="A username was registered concurrently; retry the batch"
+        )
+
+
+@app.post("/register/bulk", response_class=FastJSONResponse)
+async def register_bulk(request: Request,
+                        current_user: User = Depends(get_current_user),
+                        db: Session = Depends(get_db)):
+
+    body = await read_bulk_body(request)
+    content_type = request.headers.get("content-type", "application/json")
+    accepted, errors = await run_db(db, _plan_bulk_register, body, content_type)
+
+    hashed_passwords = await password_hasher.hash_many(
+        [row.password for _, row in accepted]
+    )
+    await run_db(db, _insert_users, accepted, hashed_passwords)
+
+    results = [
+        {"row": i, "username": row.username, "status": "created"}
+        for i, row in accepted
+    ] + [dict(e, status="error") for e in errors]
+    results.sort(key=lambda r: r["row"])
+    return {"created": len(accepted), "results": results}
+
 # ===================================================
 # LOGIN
 # ===================================================
 
-@app.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(),
-          db: Session = Depends(get_db)):
+def _find_login(db: Session, username: str):
+    # A plain row survives the rollback, which returns the connection to
+    # the pool before the caller waits on bcrypt.
+    try:
+        return db.execute(
+            select(User.id, User.username, User.department_id,
+                   User.token_version, User.hashed_password)
+            .where(User.username == username)
+        ).first()
+    finally:
+        db.rollback()
+
 
-    user = db.query(User).filter(
-        User.username == form_data.username
-    ).first()
+@app.post("/login", response_class=FastJSONResponse)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(),
+                db: Session = Depends(get_db)):
+
+    user = await run_db(db, _find_login, form_data.username)
 
-    if not user or not verify_password(
+    if not user or not await password_hasher.verify(
         form_data.password, user.hashed_password
     ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={
+        "sub": user.username,
+        "uid": user.id,
+        "department_id": user.department_id,
+        "token_version": user.token_version
+    })
 
     return {"access_token": access_token, "token_type": "bearer"}
 
+
+def _revoke_tokens(db: Session, user_id: int):
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+    )
+    db.commit()
+    # Core UPDATE bypasses the ORM events, so drop cached state here.
+    principal_cache.invalidate_user(user_id)
+    token_versions.invalidate(user_id)
+
+
+@app.post("/tokens/revoke", response_class=FastJSONResponse)
+async def revoke_tokens(current_user: User = Depends(get_current_user),
+                        db: Session = Depends(get_db)):
+
+    await run_db(db, _revoke_tokens, current_user.id)
+
+    # Other workers may accept the old tokens until their cached
+    # token_version expires.
+    return {
+        "message": "All tokens revoked",
+        "propagation_seconds": TOKEN_VERSION_TTL_SECONDS,
+    }
+
 # ===================================================
 # DEPARTMENTS
 # ===================================================
 
-@app.post("/departments", response_model=DepartmentResponse)
-def create_department(dept: DepartmentCreate,
-                      current_user: User = Depends(get_current_user),
-                      db: Session = Depends(get_db)):
-
+def _create_department(db: Session, dept: DepartmentCreate):
     new_dept = Department(
         name=dept.name,
         location=dept.location
@@ -213,36 +1641,55 @@ def create_department(dept: DepartmentCreate,
     db.add(new_dept)
     db.commit()
     db.refresh(new_dept)
+    data_changed("departments")
 
     return new_dept
 
 
-@app.get("/departments", response_model=list[DepartmentResponse])
-def get_departments(current_user: User = Depends(get_current_user),
-                    db: Session = Depends(get_db)):
+@app.post("/departments", response_model=DepartmentResponse)
+async def create_department(dept: DepartmentCreate,
+                            current_user: User = Depends(get_current_user),
+                            db: Session = Depends(get_db)):
 
-    return db.query(Department).all()
+    return await run_db(db, _create_department, dept)
+
+
+@app.get("/departments", response_model=list[DepartmentResponse])
+async def get_departments(request: Request,
+                          limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                          after: str | None = None,
+                          current_user: User = Depends(get_current_user),
+                          db: Session = Depends(get_db)):
+
+    after_id = decode_cursor(after)
+    return await cached_response(
+        request, ("departments", after_id, limit), ("departments",),
+        lambda: run_db(db, _render_page, Department, DepartmentResponse, after_id, limit)
+    )
 
 # ===================================================
 # USERS
 # ===================================================
 
 @app.get("/users", response_model=list[UserResponse])
-def get_users(current_user: User = Depends(get_current_user),
-              db: Session = Depends(get_db)):
+async def get_users(request: Request,
+                    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    after: str | None = None,
+                    current_user: User = Depends(get_current_user),
+                    db: Session = Depends(get_db)):
 
-    return db.query(User).all()
+    after_id = decode_cursor(after)
+    return await cached_response(
+        request, ("users", after_id, limit), ("users",),
+        lambda: run_db(db, _render_page, User, UserResponse, after_id, limit)
+    )
 
 # ===================================================
 # SALARY
 # ===================================================
 
-@app.post("/salary")
-def add_salary(salary: SalaryCreate,
-               current_user: User = Depends(get_current_user),
-               db: Session = Depends(get_db)):
-
-    user = db.query(User).filter(
+def _add_salary(db: Session, salary: SalaryCreate):
+    user = db.query(User.id).filter(
         User.id == salary.user_id
     ).first()
 
@@ -251,45 +1698,318 @@ def add_salary(salary: SalaryCreate,
 
     new_salary = Salary(
         user_id=salary.user_id,
-        amount=salary.amount
+        amount=salary.amount,
+        effective_date=date.today()
     )
-
     db.add(new_salary)
+    # Same guarded UPDATE as the bulk path, so a concurrent future-dated
+    # load is never overwritten with today's amount.
+    _update_current_salaries(db, [{
+        "user_id": new_salary.user_id,
+        "amount": new_salary.amount,
+        "effective_date": new_salary.effective_date
+    }])
     db.commit()
     db.refresh(new_salary)
+    # users too: current_salary is part of the user listing.
+    data_changed("salaries", "users")
+
+
+@app.post("/salary", response_class=FastJSONResponse)
+async def add_salary(salary: SalaryCreate,
+                     current_user: User = Depends(get_current_user),
+                     db: Session = Depends(get_db)):
+
+    await run_db(db, _add_salary, salary)
 
     return {"message": "Salary added successfully"}
 
+
+def _bulk_add_salaries(db: Session, body: bytes, content_type: str):
+    rows = parse_bulk_body(body, content_type, BULK_SALARY_MAX_ROWS)
+    valid, errors = validate_rows(rows, SalaryBulkRow)
+
+    known = existing_ids(db, User.id, {row.user_id for _, row in valid})
+    today = date.today()
+    values = []
+    for i, row in valid:
+        if row.user_id not in known:
+            errors.append({"row": i, "detail": "User not found"})
+            continue
+        values.append({
+            "user_id": row.user_id,
+            "amount": row.amount,
+            "effective_date": row.effective_date or today
+        })
+
+    bulk_insert(db, Salary.__table__, values)
+    _update_current_salaries(db, values)
+    db.commit()
+    data_changed("salaries", "users")
+
+    errors.sort(key=lambda e: e["row"])
+    return {"inserted": len(values), "errors": errors}
+
+
+def _update_current_salaries(db: Session, values: list):
+    # Newest row per user within the batch; later rows win date ties, as
+    # they get the higher id.
+    newest = {}
+    for row in values:
+        current = newest.get(row["user_id"])
+        if current is None or current["effective_date"] <= row["effective_date"]:
+            newest[row["user_id"]] = row
+
+    users = User.__table__
+    stmt = update(users).where(
+        users.c.id == bindparam("uid"),
+        or_(
+            users.c.current_salary_date.is_(None),
+            users.c.current_salary_date <= bindparam("date")
+        )
+    ).values(current_salary=bindparam("amount"), current_salary_date=bindparam("date"))
+
+    params = [
+        {"uid": uid, "amount": row["amount"], "date": row["effective_date"]}
+        for uid, row in newest.items()
+    ]
+    for chunk in chunks(params, BULK_CHUNK_SIZE):
+        db.execute(stmt, chunk)
+
+
+@app.post("/salary/bulk", response_class=FastJSONResponse)
+async def add_salaries_bulk(request: Request,
+                            current_user: User = Depends(get_current_user),
+                            db: Session = Depends(get_db)):
+
+    body = await read_bulk_body(request)
+    content_type = request.headers.get("content-type", "application/json")
+    return await run_db(db, _bulk_add_salaries, body, content_type)
+
 # ===================================================
 # GET USER WITH SALARY HISTORY
 # ===================================================
 
-@app.get("/users/{user_id}")
-def get_user_details(user_id: int,
-                     current_user: User = Depends(get_current_user),
-                     db: Session = Depends(get_db)):
-
-    user = db.query(User).filter(User.id == user_id).first()
-
-    if not user:
+def _user_details(db: Session, user_id: int, since: date | None,
+                  limit: int | None):
+    # One round-trip: the user, their department name and the (filtered)
+    # salary history come back as rows of a single outer join.
+    salary_join = Salary.user_id == User.id
+    if since is not None:
+        salary_join = and_(salary_join, Salary.effective_date >= since)
+
+    rows = db.query(
+        User.id,
+        User.username,
+        User.current_salary,
+        Department.name,
+        Salary.id,
+        Salary.amount,
+        Salary.effective_date
+    ).outerjoin(
+        Department, Department.id == User.department_id
+    ).outerjoin(
+        Salary, salary_join
+    ).filter(
+        User.id == user_id
+    ).order_by(
+        # Newest first so `limit` keeps the most recent salaries; the
+        # history is flipped back to chronological order below.
+        Salary.effective_date.desc(), Salary.id.desc()
+    ).limit(limit).all()
+
+    if not rows:
         raise HTTPException(status_code=404, detail="User not found")
 
-    salaries = db.query(Salary).filter(
-        Salary.user_id == user_id
-    ).all()
+    user_id, username, current_salary, department, *_ = rows[0]
 
     return {
-        "id": user.id,
-        "username": user.username,
-        "department": user.department.name if user.department else None,
+        "id": user_id,
+        "username": username,
+        "department": department,
+        "current_salary": current_salary,
         "salary_history": [
             {
-                "amount": s.amount,
-                "effective_date": s.effective_date
+                "amount": amount,
+                "effective_date": effective_date
             }
-            for s in salaries
+            for *_, salary_id, amount, effective_date in reversed(rows)
+            if salary_id is not None
         ]
     }
 
 
+@app.get("/users/{user_id}")
+async def get_user_details(user_id: int,
+                           since: date | None = None,
+                           limit: int | None = Query(None, ge=1),
+                           current_user: User = Depends(get_current_user),
+                           db: Session = Depends(get_db)):
+
+    # Returned directly so long histories skip jsonable_encoder.
+    return FastJSONResponse(
+        await run_db(db, _user_details, user_id, since, limit)
+    )
+
+# ===================================================
+# EXPORT
+# ===================================================
+
+# Exports run on their own session rather than the request's, since the
+# response body is produced after the handler has returned. Rows are pulled
+# from the cursor EXPORT_BATCH_SIZE at a time, so memory stays flat no
+# matter how large the table is.
+
+def _ndjson(partition):
+    return b"".join(
+        orjson.dumps(row._asdict(), option=orjson.OPT_APPEND_NEWLINE)
+        for row in partition
+    )
+
+def _stream_rows(sessions, stmt):
+    stmt = stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    db = sessions()
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield _ndjson(partition)
+    finally:
+        db.close()
+
+async def _stream_rows_async(sessions, stmt):
+    stmt = stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with sessions() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield _ndjson(partition)
+
+def ndjson_response(request: Request, stmt):
+    replica = reads_from_replica(request)
+    if DATABASE_ASYNC:
+        rows = _stream_rows_async(AsyncReplicaSessionLocal if replica else AsyncSessionLocal, stmt)
+    else:
+        rows = _stream_rows(ReplicaSessionLocal if replica else SessionLocal, stmt)
+    return StreamingResponse(rows, media_type="application/x-ndjson")
+
+
+@app.get("/export/users.ndjson")
+async def export_users(request: Request,
+                       department_id: int | None = None,
+                       current_user: User = Depends(get_current_user)):
+
+    stmt = select(User.id, User.username, User.department_id).order_by(User.id)
+    if department_id is not None:
+        stmt = stmt.where(User.department_id == department_id)
+
+    return ndjson_response(request, stmt)
+
+
+@app.get("/export/salaries.ndjson")
+async def export_salaries(request: Request,
+                          department_id: int | None = None,
+                          since: date | None = None,
+                          until: date | None = None,
+                          current_user: User = Depends(get_current_user)):
+
+    stmt = select(
+        Salary.id, Salary.user_id, Salary.amount, Salary.effective_date
+    ).order_by(Salary.id)
+    if department_id is not None:
+        stmt = stmt.join(User, User.id == Salary.user_id).where(
+            User.department_id == department_id
+        )
+    if since is not None:
+        stmt = stmt.where(Salary.effective_date >= since)
+    if until is not None:
+        stmt = stmt.where(Salary.effective_date <= until)
+
+    return ndjson_response(request, stmt)
+
+
+# ===================================================
+# PAYROLL
+# ===================================================
+
+class PayrollCache:
+    """Short-lived cache of payroll aggregates, cleared on every write that
+    can change them (users, departments, salaries).
+
+    Other workers' writes only show up once `ttl` expires.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries = {}  # (department id or None, replica) -> (expires_at, rows)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None, self._generation
+            return entry[1], self._generation
+
+    def put(self, key, rows, generation: int):
+        with self._lock:
+            # Skip results computed before an invalidation landed.
+            if self.ttl > 0 and generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, rows)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+payroll_cache = PayrollCache(PAYROLL_CACHE_TTL_SECONDS)
+
+
+def _payroll(db: Session, department_id: int | None):
+    stmt = select(
+        Department.id.label("department_id"),
+        Department.name.label("department"),
+        func.count(User.id).label("headcount"),
+        func.sum(User.current_salary).label("total"),
+        func.avg(User.current_salary).label("average"),
+        func.min(User.current_salary).label("min"),
+        func.max(User.current_salary).label("max")
+    ).select_from(Department).outerjoin(
+        User, User.department_id == Department.id
+    ).group_by(
+        Department.id, Department.name
+    ).order_by(Department.id)
+
+    if department_id is not None:
+        stmt = stmt.where(Department.id == department_id)
+
+    return [row._asdict() for row in db.execute(stmt)]
+
+
+async def payroll(db: Session, department_id: int | None = None):
+    key = (department_id, db.info.get("replica", False))
+    rows, generation = payroll_cache.get(key)
+    if rows is None:
+        rows = await run_db(db, _payroll, department_id)
+        payroll_cache.put(key, rows, generation)
+    return rows
+
+
+@app.get("/departments/payroll", response_model=list[PayrollResponse])
+async def get_payroll(current_user: User = Depends(get_current_user),
+                      db: Session = Depends(get_db)):
+
+    return await payroll(db)
+
+
+@app.get("/departments/{department_id}/payroll", response_model=PayrollResponse)
+async def get_department_payroll(department_id: int,
+                                 current_user: User = Depends(get_current_user),
+                                 db: Session = Depends(get_db)):
+
+    rows = await payroll(db, department_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Department not found")
+    return rows[0]
+
+
 #testttttt
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Maintenance commands, run as `python -m apis.manage <command>`.
+
+    migrate [--force]          apply schema changes (skipped if already current)
+    backfill-current-salary    rebuild users.current_salary from salaries
+"""
+
+import argparse
+
+from apis.main import backfill_current_salary, engine, ensure_schema, migrate_schema
+
+
+def migrate(args):
+    if args.force:
+        migrate_schema(engine)
+        print("Schema migrated")
+    elif ensure_schema(engine):
+        print("Schema migrated")
+    else:
+        print("Schema already up to date")
+
+
+def backfill(args):
+    with engine.begin() as conn:
+        count = backfill_current_salary(conn)
+    print(f"Backfilled current salary for {count} users")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m apis.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="apply schema changes")
+    migrate_parser.add_argument("--force", action="store_true",
+                                help="migrate even if the recorded version matches")
+    migrate_parser.set_defaults(func=migrate)
+
+    backfill_parser = commands.add_parser("backfill-current-salary",
+                                          help="rebuild users.current_salary")
+    backfill_parser.set_defaults(func=backfill)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Throughput, latency and query counts for every route in apis.main.
+
+Seeds a throwaway SQLite database with synthetic departments, users and
+salaries, then drives each route with a fixed number of concurrent
+clients. By default requests go to the app in-process over ASGI, so the
+run is fully offline. Pass --base-url to target a running server instead;
+query counts are only reported in-process. Results are printed as JSON
+for regression comparison.
+
+The shell's DATABASE_URL is ignored; set BENCH_DATABASE_URL to seed and
+benchmark a scratch database on another backend instead.
+
+    python -m benchmarks.endpoints --scale 1000 --requests 500 --concurrency 16
+    python -m benchmarks.endpoints --scale 100000 --routes users user_details
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import event, insert
+
+# apis.main reads its database URLs at import time and seed() fills the
+# database with synthetic rows, so never inherit the shell's settings.
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or "sqlite:///{}".format(
+    os.path.join(tempfile.mkdtemp(prefix="apis-bench-"), "app.db")
+)
+os.environ.pop("DATABASE_REPLICA_URL", None)
+
+from apis.main import (  # noqa: E402
+    Department, Salary, User, app, backfill_current_salary, engine,
+    ensure_schema, hash_password
+)
+
+PASSWORD = "bench-password"
+
+
+def seed(scale, salaries_per_user, chunk=50_000):
+    ensure_schema(engine)
+    rng = random.Random(0)
+    departments = max(scale // 100, 1)
+    hashed = hash_password(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(Department), [
+            {"name": f"dept{i}", "location": f"site{i % 7}"} for i in range(departments)
+        ])
+        for lo in range(0, scale, chunk):
+            conn.execute(insert(User), [
+                {"username": f"user{i}", "hashed_password": hashed,
+                 "department_id": rng.randint(1, departments)}
+                for i in range(lo, min(lo + chunk, scale))
+            ])
+        total = scale * salaries_per_user
+        for lo in range(0, total, chunk):
+            conn.execute(insert(Salary), [
+                {"user_id": rng.randint(1, scale),
+                 "amount": rng.randint(30_000, 300_000),
+                 "effective_date": date(2000, 1, 1) + timedelta(days=rng.randint(0, 9000))}
+                for _ in range(lo, min(lo + chunk, total))
+            ])
+        backfill_current_salary(conn)
+
+
+def route_table(scale):
+    counter = iter(range(sys.maxsize))
+
+    return {
+        "register": lambda rng: ("POST", "/register", {
+            "json": {"username": f"bench{next(counter)}", "password": PASSWORD}
+        }),
+        "login": lambda rng: ("POST", "/login", {
+            "data": {"username": f"user{rng.randrange(scale)}", "password": PASSWORD}
+        }),
+        "departments": lambda rng: ("GET", "/departments", {}),
+        "users": lambda rng: ("GET", "/users", {}),
+        "salary": lambda rng: ("POST", "/salary", {
+            "json": {"user_id": rng.randint(1, scale), "amount": rng.randint(30_000, 300_000)}
+        }),
+        "user_details": lambda rng: ("GET", f"/users/{rng.randint(1, scale)}", {}),
+    }
+
+
+async def drive(client, make_request, requests, concurrency, headers):
+    rng = random.Random(2)
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, kwargs = make_request(rng)
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+async def run(args):
+    queries = [0]
+    if args.base_url is None:
+        event.listen(engine, "before_cursor_execute",
+                     lambda *a: queries.__setitem__(0, queries[0] + 1))
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        lifespan = app.router.lifespan_context(app)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url)
+        lifespan = None
+
+    results = {}
+    try:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        token = (await client.post("/login", data={
+            "username": "user0", "password": PASSWORD
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        routes = route_table(args.scale)
+        for name in args.routes:
+            before = queries[0]
+            result = await drive(client, routes[name], args.requests,
+                                 args.concurrency, headers)
+            if args.base_url is None:
+                result["queries_per_request"] = (queries[0] - before) / args.requests
+            results[name] = result
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def main():
+    routes = list(route_table(0))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1000,
+                        help="number of seeded users (e.g. 1000, 100000, 1000000)")
+    parser.add_argument("--salaries-per-user", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--routes", nargs="+", choices=routes, default=routes)
+    parser.add_argument("--base-url",
+                        help="benchmark a running server (seed it separately)")
+    args = parser.parse_args()
+
+    if args.base_url is None:
+        seed(args.scale, args.salaries_per_user)
+    results = asyncio.run(run(args))
+    print(json.dumps({"scale": args.scale, "routes": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""CPU and memory of rendering a /users page: ORM + Pydantic vs column rows.
+
+Seeds a throwaway SQLite database, then renders one page of --rows users
+both ways. The first way loads full User instances and validates each one
+through UserResponse. The second is _render_page, which selects the
+response columns as plain rows. Prints time and tracemalloc peak as JSON.
+
+    python -m benchmarks.list_rendering --rows 100000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import orjson
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from apis.main import Base, User, UserResponse, _render_page
+
+
+def orm_page(db, limit):
+    rows = db.query(User).order_by(User.id).limit(limit).all()
+    return orjson.dumps([
+        UserResponse.model_validate(row, from_attributes=True).model_dump()
+        for row in rows
+    ])
+
+
+def column_page(db, limit):
+    return _render_page(db, User, UserResponse, 0, limit)[0]
+
+
+def measure(engine, render, limit, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            render(db, limit)
+            best = min(best, time.perf_counter() - start)
+
+    with Session(engine) as db:
+        tracemalloc.start()
+        render(db, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"ms": best * 1000, "peak_mib": peak / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                conn.execute(insert(User), [
+                    {"username": f"user{i}", "hashed_password": "x" * 75,
+                     "department_id": None, "current_salary": 50_000 + i}
+                    for i in range(args.rows)
+                ])
+
+            results = {
+                "rows": args.rows,
+                "orm_and_pydantic": measure(engine, orm_page, args.rows, args.repeat),
+                "column_rows": measure(engine, column_page, args.rows, args.repeat),
+            }
+        finally:
+            engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
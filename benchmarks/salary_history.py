@@ -0,0 +1,101 @@
+"""Per-request latency of the GET /users/{id} query before and after indexes.
+
+Seeds a throwaway SQLite database without the salaries/users secondary
+indexes, times the get_user_details query for random users, then applies
+migrate_schema (the same path existing databases take) and times it again.
+Results are printed as JSON.
+
+    python -m benchmarks.salary_history --salaries 10000000 --users 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from apis.main import Base, Salary, User, _user_details, migrate_schema, tune_sqlite
+
+NEW_INDEXES = ("ix_salaries_user_id_effective_date", "ix_users_department_id")
+
+
+def seed(engine, users, salaries, chunk=50_000):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    start_date = date(2000, 1, 1)
+    with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for lo in range(0, users, chunk):
+            conn.execute(insert(User), [
+                {"username": f"user{i}", "hashed_password": "x", "department_id": None}
+                for i in range(lo, min(lo + chunk, users))
+            ])
+        for lo in range(0, salaries, chunk):
+            conn.execute(insert(Salary), [
+                {
+                    "user_id": rng.randint(1, users),
+                    "amount": rng.randint(30_000, 300_000),
+                    "effective_date": start_date + timedelta(days=rng.randint(0, 9000)),
+                }
+                for _ in range(lo, min(lo + chunk, salaries))
+            ])
+
+
+def measure(engine, users, requests):
+    rng = random.Random(1)
+    latencies = []
+    with Session(engine) as db:
+        for _ in range(requests):
+            user_id = rng.randint(1, users)
+            start = time.perf_counter()
+            _user_details(db, user_id, None, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salaries", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        tune_sqlite(engine)
+        try:
+            start = time.perf_counter()
+            seed(engine, args.users, args.salaries)
+            seeded = time.perf_counter() - start
+
+            before = measure(engine, args.users, args.requests)
+            start = time.perf_counter()
+            migrate_schema(engine)
+            migrated = time.perf_counter() - start
+            after = measure(engine, args.users, args.requests)
+        finally:
+            engine.dispose()
+
+    print(json.dumps({
+        "salaries": args.salaries,
+        "users": args.users,
+        "seed_seconds": seeded,
+        "migrate_seconds": migrated,
+        "without_indexes": before,
+        "with_indexes": after,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Serialization cost of large responses: stdlib JSONResponse vs FastJSONResponse.
+
+Renders a /users-shaped list and a salary-history-shaped list (with date
+values) three ways and prints the best-of-N timings as JSON. The three ways
+are: the stdlib encoder, orjson after FastAPI's jsonable_encoder (what a
+route returning a plain dict gets), and orjson directly (what the cached
+list pages and routes returning FastJSONResponse get).
+
+    python -m benchmarks.serialization --users 100000
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from apis.main import FastJSONResponse
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    users = [
+        {"id": i, "username": f"user{i}", "department_id": i % 50 or None,
+         "current_salary": 50_000 + i}
+        for i in range(1, args.users + 1)
+    ]
+    history = [
+        {"amount": 50_000 + i, "effective_date": date(2000, 1, 1) + timedelta(days=i % 9000)}
+        for i in range(args.users)
+    ]
+
+    results = {}
+    for name, payload in (("users", users), ("salary_history", history)):
+        # The stdlib path can't encode date on its own; FastAPI runs
+        # jsonable_encoder first, so that is included here.
+        stdlib = best_of(args.repeat, lambda: JSONResponse(jsonable_encoder(payload)))
+        encoded = best_of(
+            args.repeat, lambda: FastJSONResponse(jsonable_encoder(payload))
+        )
+        fast = best_of(args.repeat, lambda: FastJSONResponse(payload))
+        results[name] = {
+            "rows": len(payload),
+            "stdlib_ms": stdlib,
+            "orjson_after_jsonable_encoder_ms": encoded,
+            "orjson_direct_ms": fast,
+            "speedup": stdlib / fast,
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Compare SQLite's default settings against the SQLITE_PRAGMAS profile.
+
+Measures single-row commit throughput (the add_salary / register pattern)
+and read latency while a writer is committing in the background. Results
+are printed as JSON.
+
+    python -m benchmarks.sqlite_tuning --writes 500 --reads 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+from apis.main import Base, Salary, SQLITE_PRAGMAS, tune_sqlite
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if pragmas:
+        tune_sqlite(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def write_throughput(engine, writes):
+    start = time.perf_counter()
+    for i in range(writes):
+        with engine.begin() as conn:
+            conn.execute(insert(Salary).values(user_id=i % 100 + 1, amount=i))
+    return writes / (time.perf_counter() - start)
+
+
+def read_under_write(engine, reads, write_interval):
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            with engine.begin() as conn:
+                conn.execute(insert(Salary).values(user_id=i % 100 + 1, amount=i))
+            i += 1
+            time.sleep(write_interval)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    latencies, locked = [], 0
+    try:
+        with engine.connect() as conn:
+            stmt = select(Salary.amount).where(Salary.user_id == 1)
+            for _ in range(reads):
+                start = time.perf_counter()
+                try:
+                    conn.execute(stmt).all()
+                except OperationalError:
+                    locked += 1
+                conn.rollback()
+                latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        stop.set()
+        thread.join()
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "locked_errors": locked,
+    }
+
+
+def run(label, pragmas, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), pragmas)
+        try:
+            return {
+                "profile": label,
+                "writes_per_sec": write_throughput(engine, args.writes),
+                "read_under_write": read_under_write(
+                engine, args.reads, args.write_interval_ms / 1000
+            ),
+            }
+        finally:
+            engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--write-interval-ms", type=float, default=1.0,
+                        help="pause between background writer commits")
+    args = parser.parse_args()
+
+    results = [run("default", {}, args), run("tuned", SQLITE_PRAGMAS, args)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Gunicorn settings for multi-process serving (see Procfile).
+
+Worker count comes from WEB_CONCURRENCY and defaults to one per core.
+"""
+
+import fcntl
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# The master applies the schema in on_starting (and again on HUP); workers
+# must not race each other on DDL at startup.
+os.environ["SCHEMA_BOOTSTRAP"] = "0"
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Split the cores between web workers instead of giving each its own
+# full-size bcrypt pool.
+os.environ.setdefault(
+    "PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers))
+)
+
+
+# Workers publish their metrics here so that /metrics, whichever worker
+# answers it, reports totals for the whole server (see METRICS_DIR in
+# apis/main.py).
+if not os.getenv("METRICS_DIR"):
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="apis-metrics-")
+    # In the environment, as HUP re-reads this file.
+    os.environ["METRICS_DIR_TEMPORARY"] = "1"
+metrics_dir = os.environ["METRICS_DIR"]
+
+
+def clear_metrics():
+    for name in os.listdir(metrics_dir):
+        if name.endswith((".json", ".tmp")):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def migrate():
+    # In a child process: importing apis.main here would pin the master's
+    # copy of the app into every worker forked later, so HUP would keep
+    # serving the old code.
+    subprocess.run([sys.executable, "-m", "apis.manage", "migrate"], check=True)
+
+
+def on_starting(server):
+    # Files left by a previous run would count as live workers.
+    clear_metrics()
+    migrate()
+
+
+def on_reload(server):
+    # A reload may bring a new SCHEMA_VERSION; apply it before new workers.
+    migrate()
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the totals, but under a name that
+    # no longer marks it as live. The lock is the one /metrics reads under.
+    path = os.path.join(metrics_dir, f"{worker.pid}.json")
+    with open(os.path.join(metrics_dir, "lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(path):
+            os.replace(path, os.path.join(
+                metrics_dir, f"exited-{worker.pid}-{time.time_ns()}.json"
+            ))
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+
+
+def on_exit(server):
+    if os.getenv("METRICS_DIR_TEMPORARY") == "1":
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    else:
+        clear_metrics()
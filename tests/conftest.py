@@ -0,0 +1,53 @@
+"""Shared test setup; run the suite with `python -m pytest` from the repo root.
+
+apis.main reads its configuration at import time, so it is pointed at
+throwaway SQLite files (a primary and a read replica) before any test
+imports it. Set TEST_POSTGRES_URL to a scratch PostgreSQL database to run
+the PostgreSQL cases as well; they drop and recreate the app's tables.
+DATABASE_ASYNC=1 and STATELESS_TOKENS=1 are passed through, so the suite
+can also run in those modes.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="apis-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'primary.db')}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{os.path.join(_workdir, 'replica.db')}"
+os.environ["READ_YOUR_WRITES_SECONDS"] = "60"
+os.environ["PASSWORD_HASH_WORKERS"] = "1"
+os.environ.setdefault("DATABASE_ASYNC", "0")
+os.environ.setdefault("STATELESS_TOKENS", "0")
+
+
+@pytest.fixture
+def postgres_url():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    return url
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from apis.main import app, principal_cache
+
+    principal_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client):
+    """Register a user (unless it exists) and return bearer headers for it."""
+
+    def login(username, password="pw"):
+        client.post("/register", json={"username": username, "password": password})
+        response = client.post("/login", data={"username": username, "password": password})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return login
@@ -0,0 +1,29 @@
+from sqlalchemy import select, update
+
+import apis.main
+from apis.main import User, engine, token_versions
+
+
+def test_revocation_by_another_worker(client, login):
+    headers = login("other-worker")
+    assert client.get("/users", headers=headers).status_code == 200
+
+    # Another worker bumps the version, so this process's principal cache is
+    # not invalidated; the token must still fail once the cached
+    # token_version expires.
+    with engine.begin() as conn:
+        conn.execute(
+            update(User)
+            .where(User.username == "other-worker")
+            .values(token_version=User.token_version + 1)
+        )
+        user_id = conn.execute(
+            select(User.id).where(User.username == "other-worker")
+        ).scalar_one()
+    token_versions.invalidate(user_id)
+
+    assert client.get("/users", headers=headers).status_code == 401
+
+
+def test_principal_ttl_capped():
+    assert apis.main.principal_cache.ttl <= apis.main.TOKEN_VERSION_TTL_SECONDS
@@ -0,0 +1,31 @@
+import apis.main
+
+
+def test_bulk_salaries_row_limit(client, login, monkeypatch):
+    headers = login("bulk-limit")
+    monkeypatch.setattr(apis.main, "BULK_SALARY_MAX_ROWS", 2)
+    rows = [{"user_id": 1, "amount": i} for i in range(3)]
+
+    response = client.post("/salary/bulk", json=rows, headers=headers)
+    assert response.status_code == 413
+    assert client.post("/salary/bulk", json=rows[:2], headers=headers).status_code == 200
+
+
+def test_bulk_body_size_limit(client, login, monkeypatch):
+    headers = login("bulk-bytes")
+    monkeypatch.setattr(apis.main, "BULK_MAX_BODY_BYTES", 64)
+    body = "\n".join(f'{{"user_id": 1, "amount": {i}}}' for i in range(10))
+
+    for path in ("/salary/bulk", "/register/bulk"):
+        response = client.post(path, content=body, headers={
+            **headers, "content-type": "application/x-ndjson"
+        })
+        assert response.status_code == 413
+
+
+def test_bulk_register_row_limit(client, login, monkeypatch):
+    headers = login("bulk-register-limit")
+    monkeypatch.setattr(apis.main, "BULK_REGISTER_MAX_ROWS", 1)
+    rows = [{"username": f"limit{i}", "password": "pw"} for i in range(2)]
+
+    assert client.post("/register/bulk", json=rows, headers=headers).status_code == 413
@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from apis.main import User, engine
+
+USERS = "/users?limit=1000"
+DEPARTMENTS = "/departments?limit=1000"
+
+
+def etag(client, headers, path):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def test_not_modified_runs_no_queries(client, login):
+    headers = login("etag")
+    tag = etag(client, headers, USERS)
+
+    response = client.get(USERS, headers={**headers, "If-None-Match": tag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == tag
+    assert 'db;desc="0 queries"' in response.headers["server-timing"]
+
+
+def test_writes_change_the_etag(client, login):
+    headers = login("etag-writer")
+    with engine.connect() as conn:
+        uid = conn.execute(select(User.id).where(User.username == "etag-writer")).scalar_one()
+
+    writes = [
+        (USERS, lambda: client.post(
+            "/register", json={"username": "etag-new", "password": "pw"})),
+        (USERS, lambda: client.post(
+            "/salary", json={"user_id": uid, "amount": 100}, headers=headers)),
+        (DEPARTMENTS, lambda: client.post(
+            "/departments", json={"name": "etag-dept", "location": "x"}, headers=headers)),
+        (USERS, lambda: client.post(
+            "/register/bulk", json=[{"username": "etag-bulk", "password": "pw"}],
+            headers=headers)),
+        (USERS, lambda: client.post(
+            "/salary/bulk", json=[{"user_id": uid, "amount": 200}], headers=headers)),
+    ]
+    for path, write in writes:
+        before = etag(client, headers, path)
+        assert write().status_code == 200
+        assert etag(client, headers, path) != before, path
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from apis.main import (
+    Base, HTTPException, Salary, User, UserCreate, _insert_users, _split_url,
+    async_url, bulk_insert, engine_options, sync_url
+)
+
+
+def rows(*usernames):
+    return [(i, UserCreate(username=name, password="pw")) for i, name in enumerate(usernames)]
+
+
+def with_driver(url, driver):
+    dialect, _, rest = _split_url(url)
+    return f"{dialect}+{driver}://{rest}"
+
+
+def count_users(db):
+    return db.scalar(select(func.count()).select_from(User))
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./app.db", "sqlite:///./app.db"),
+    ("sqlite+aiosqlite:///./app.db", "sqlite+pysqlite:///./app.db"),
+    ("postgres://u@h/db", "postgresql+psycopg://u@h/db"),
+    ("postgresql://u@h/db", "postgresql+psycopg://u@h/db"),
+    ("postgresql+psycopg2://u@h/db", "postgresql+psycopg2://u@h/db"),
+    ("postgresql+asyncpg://u@h/db", "postgresql+psycopg://u@h/db"),
+])
+def test_sync_url(url, expected):
+    assert sync_url(url) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./app.db", "sqlite+aiosqlite:///./app.db"),
+    ("postgres://u@h/db", "postgresql+asyncpg://u@h/db"),
+    ("postgresql+psycopg://u@h/db", "postgresql+asyncpg://u@h/db"),
+])
+def test_async_url(url, expected):
+    assert async_url(url) == expected
+
+
+def test_engine_options_only_sqlite_gets_check_same_thread():
+    assert engine_options("sqlite:///./app.db")["connect_args"] == {"check_same_thread": False}
+    assert "connect_args" not in engine_options("postgresql://u@h/db")
+
+
+@pytest.fixture
+def sqlite_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+def test_bulk_insert_sqlite(sqlite_session):
+    db = sqlite_session
+    bulk_insert(db, User.__table__, [{"username": f"u{i}"} for i in range(2500)])
+    bulk_insert(db, Salary.__table__, [])
+    db.commit()
+    assert count_users(db) == 2500
+
+
+def test_insert_users_duplicate_is_409_sqlite(sqlite_session):
+    db = sqlite_session
+    _insert_users(db, rows("a"), ["h"])
+    with pytest.raises(HTTPException) as exc:
+        _insert_users(db, rows("b", "a"), ["h", "h"])
+    assert exc.value.status_code == 409
+    assert count_users(db) == 1
+
+
+@pytest.fixture(params=["psycopg", "psycopg2"])
+def postgres_session(request, postgres_url):
+    if request.param == "psycopg2":
+        pytest.importorskip("psycopg2")
+    engine = create_engine(with_driver(postgres_url, request.param))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+def test_bulk_insert_postgres(postgres_session):
+    # COPY with psycopg 3, executemany fallback with psycopg2.
+    db = postgres_session
+    bulk_insert(db, User.__table__, [{"username": f"u{i}"} for i in range(2500)])
+    db.commit()
+    assert count_users(db) == 2500
+
+
+def test_insert_users_duplicate_is_409_postgres(postgres_session):
+    db = postgres_session
+    _insert_users(db, rows("a"), ["h"])
+    with pytest.raises(HTTPException) as exc:
+        _insert_users(db, rows("b", "a"), ["h", "h"])
+    assert exc.value.status_code == 409
+    assert count_users(db) == 1
+
+
+def test_copy_asyncpg(postgres_url):
+    pytest.importorskip("asyncpg")
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    Base.metadata.drop_all(bind=create_engine(sync_url(postgres_url)))
+
+    async def run():
+        engine = create_async_engine(async_url(postgres_url))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            async with AsyncSession(engine) as db:
+                await db.run_sync(_insert_users, rows("a"), ["h"])
+            async with AsyncSession(engine) as db:
+                with pytest.raises(HTTPException) as exc:
+                    await db.run_sync(_insert_users, rows("b", "a"), ["h", "h"])
+                assert exc.value.status_code == 409
+            # Nothing runs before this COPY; it must still join the
+            # session's transaction rather than autocommit.
+            async with AsyncSession(engine) as db:
+                await db.run_sync(bulk_insert, User.__table__, [{"username": "c"}])
+                await db.rollback()
+            async with AsyncSession(engine) as db:
+                return await db.run_sync(count_users)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,45 @@
+import os
+
+import orjson
+
+import apis.main
+
+SERIES = 'apis_http_requests_total{method="GET",route="/departments",status="200"}'
+
+
+def write(path, rows):
+    path.write_bytes(orjson.dumps(rows))
+
+
+def value(text, series):
+    return next(float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+                if line.startswith(series + " "))
+
+
+def test_metrics_are_summed_over_workers(client, login, tmp_path, monkeypatch):
+    monkeypatch.setattr(apis.main, "METRICS_DIR", str(tmp_path))
+    headers = login("metrics")
+    client.get("/departments", headers=headers)
+    own = value(client.get("/metrics").text, SERIES)
+
+    labels = 'method="GET",route="/departments",status="200"'
+    other = [
+        ["counter", "apis_http_requests_total", labels, 5],
+        ["gauge", "apis_http_requests_in_flight", 'worker="1"', 3],
+    ]
+    write(tmp_path / "1.json", other)
+    write(tmp_path / "exited-2-1.json", [["counter", "apis_http_requests_total", labels, 7]])
+    write(tmp_path / "exited-3-1.json", [
+        ["counter", "apis_http_requests_total", labels, 11],
+        ["gauge", "apis_http_requests_in_flight", 'worker="3"', 9],
+    ])
+
+    text = client.get("/metrics").text
+    assert value(text, SERIES) == own + 5 + 7 + 11
+    assert value(text, 'apis_http_requests_in_flight{worker="1"}') == 3
+    assert f'apis_http_requests_in_flight{{worker="{os.getpid()}"}}' in text
+    assert 'worker="3"' not in text
+
+    # Exited workers' files are folded into one without changing the totals.
+    assert sorted(p.name for p in tmp_path.glob("exited*")) == ["exited.json"]
+    assert value(client.get("/metrics").text, SERIES) == own + 5 + 7 + 11
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from apis.main import (
+    PRIMARY_COOKIE, app, engine, ensure_schema, principal_cache, replica_engine, response_cache
+)
+
+
+def replicate():
+    """Stand-in for replication: copy the primary SQLite file onto the replica."""
+    source = sqlite3.connect(engine.url.database)
+    target = sqlite3.connect(replica_engine.url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    # Pooled replica connections may have cached the old schema.
+    replica_engine.dispose()
+
+
+@pytest.fixture
+def client():
+    assert replica_engine is not engine
+    ensure_schema(engine)
+    replicate()
+    principal_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+def register_and_login(client, username):
+    assert client.post("/register", json={"username": username, "password": "pw"}).status_code == 200
+    token = client.post("/login", data={"username": username, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_writes_pin_the_client_to_the_primary(client):
+    headers = register_and_login(client, "pinned")
+    assert PRIMARY_COOKIE in client.cookies
+
+    client.post("/departments", json={"name": "pinned-dept", "location": "x"}, headers=headers)
+    names = {d["name"] for d in client.get("/departments", headers=headers).json()}
+    assert "pinned-dept" in names
+
+    # The same token without the cookie reads from the lagging replica.
+    client.cookies.clear()
+    names = {d["name"] for d in client.get("/departments", headers=headers).json()}
+    assert "pinned-dept" not in names
+
+
+def test_replica_miss_falls_back_to_primary_for_auth(client):
+    headers = register_and_login(client, "cookieless")
+    client.cookies.clear()
+
+    response = client.get("/users", headers=headers)
+    assert response.status_code == 200
+    assert "cookieless" not in {u["username"] for u in response.json()}
+
+
+def test_new_token_version_on_lagging_replica_is_accepted(client):
+    headers = register_and_login(client, "revoker")
+    replicate()
+    assert client.post("/tokens/revoke", headers=headers).status_code == 200
+    token = client.post("/login", data={"username": "revoker", "password": "pw"}).json()["access_token"]
+    client.cookies.clear()
+    principal_cache.clear()
+
+    # The replica still has the old token_version.
+    assert client.get("/users", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    # Revocation reaches replica reads once replication catches up.
+    replicate()
+    principal_cache.clear()
+    assert client.get("/users", headers=headers).status_code == 401
+
+
+def test_unpinned_reads_see_replicated_data(client):
+    headers = register_and_login(client, "replicated")
+    replicate()
+    client.cookies.clear()
+
+    usernames = {u["username"] for u in client.get("/users?limit=1000", headers=headers).json()}
+    assert "replicated" in usernames
+
+
+def test_replica_pages_not_cached_after_a_write(client):
+    headers = register_and_login(client, "cache-window")
+    client.post("/departments", json={"name": "cache-window", "location": "x"}, headers=headers)
+    client.cookies.clear()
+
+    # Rendered from the replica within READ_YOUR_WRITES_SECONDS of the
+    # write, so it may predate it and must not be stored.
+    assert client.get("/departments", headers=headers).status_code == 200
+    assert not any(replica for _, replica in response_cache._entries)
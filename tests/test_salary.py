@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from apis.main import User, backfill_current_salary, engine
+
+TODAY = date.today()
+
+
+def user_id(username):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(User.id).where(User.username == username)
+        ).scalar_one()
+
+
+def current_salaries():
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(User.id, User.current_salary, User.current_salary_date)
+        ).all()
+    return {uid: (amount, effective_date) for uid, amount, effective_date in rows}
+
+
+def bulk(client, headers, rows):
+    response = client.post("/salary/bulk", json=[
+        {**row, "effective_date": row["effective_date"].isoformat()} for row in rows
+    ], headers=headers)
+    assert response.status_code == 200
+    assert response.json()["errors"] == []
+
+
+def current_salary(client, headers, uid):
+    return client.get(f"/users/{uid}", headers=headers).json()["current_salary"]
+
+
+def test_backdated_bulk_row_keeps_newer_salary(client, login):
+    headers = login("backdated")
+    uid = user_id("backdated")
+    bulk(client, headers, [{"user_id": uid, "amount": 200, "effective_date": TODAY}])
+    bulk(client, headers, [
+        {"user_id": uid, "amount": 100, "effective_date": TODAY - timedelta(days=30)}
+    ])
+
+    assert current_salary(client, headers, uid) == 200
+
+
+def test_same_date_tie_goes_to_later_row(client, login):
+    headers = login("same-date")
+    uid = user_id("same-date")
+    bulk(client, headers, [
+        {"user_id": uid, "amount": 100, "effective_date": TODAY},
+        {"user_id": uid, "amount": 150, "effective_date": TODAY},
+    ])
+    assert current_salary(client, headers, uid) == 150
+
+    bulk(client, headers, [{"user_id": uid, "amount": 175, "effective_date": TODAY}])
+    assert current_salary(client, headers, uid) == 175
+
+
+def test_add_salary_after_future_dated_bulk(client, login):
+    headers = login("future-dated")
+    uid = user_id("future-dated")
+    bulk(client, headers, [
+        {"user_id": uid, "amount": 300, "effective_date": TODAY + timedelta(days=30)}
+    ])
+
+    response = client.post("/salary", json={"user_id": uid, "amount": 250}, headers=headers)
+    assert response.status_code == 200
+    assert current_salary(client, headers, uid) == 300
+
+
+def test_backfill_matches_incremental_updates(client, login):
+    headers = login("backfill")
+    uid = user_id("backfill")
+    bulk(client, headers, [
+        {"user_id": uid, "amount": 10, "effective_date": TODAY - timedelta(days=1)},
+        {"user_id": uid, "amount": 20, "effective_date": TODAY + timedelta(days=1)},
+        {"user_id": uid, "amount": 30, "effective_date": TODAY + timedelta(days=1)},
+        {"user_id": uid, "amount": 5, "effective_date": TODAY - timedelta(days=10)},
+    ])
+    client.post("/salary", json={"user_id": uid, "amount": 40}, headers=headers)
+
+    incremental = current_salaries()
+    assert incremental[uid] == (30, TODAY + timedelta(days=1))
+    with engine.begin() as conn:
+        backfill_current_salary(conn)
+    assert current_salaries() == incremental